@@ -2,11 +2,12 @@
 
 from __future__ import division
 
+import threading
 import warnings
 import numpy as np
 
 from chebpy.core.ffts import fft, ifft
-from chebpy.core.utilities import Interval, infnorm
+from chebpy.core.utilities import Interval, infnorm, numba, _isjittable
 from chebpy.core.settings import userPrefs as prefs
 from chebpy.core.decorators import preandpostprocess
 
@@ -16,6 +17,34 @@ np.seterr(divide='ignore', invalid='ignore')
 # constants
 SPLITPOINT = -0.004849834917525
 
+# per-thread work arrays reused by the numpy implementation of bary, and
+# the largest size in bytes of any such array kept between calls
+_BARY_SCRATCH = threading.local()
+_SCRATCH_MAX_BYTES = 2**24
+
+# fastmath flags which permit reordering of the sums but preserve the
+# IEEE semantics of nans, infs and exact comparisons
+FASTMATH = {'contract', 'reassoc'}
+
+# number of evaluation points per block in the compiled Clenshaw kernel
+CLENSHAW_BLOCK = 256
+
+# maximum series length for which clenshaw uses an unrolled recurrence
+# (when the compiled kernel is not available), and the cache of these
+CLENSHAW_UNROLL_MAX = 32
+_CLENSHAW_UNROLLED = {}
+
+# minimum series length for which clenshaw (when the compiled kernel is not
+# available) switches to the Paterson-Stockmeyer splitting
+CLENSHAW_PS_MIN = 64
+
+# maximum series length multiplied directly (rather than via the FFT)
+COEFFMULT_DIRECT_MAX = 256
+
+# size in bytes of the workspace used by the numpy implementation of
+# bary_batch, which bounds its memory use independently of the length
+BARY_BATCH_BYTES = 2**24
+
 # local helpers
 def find(x):
     return np.where(x)[0]
@@ -83,8 +112,86 @@ def rootsunit(ak, htol=None):
         rts[-1] = min([rts[-1], 1])
     return rts
 
+if numba:
+    @numba.njit(cache=True, fastmath=FASTMATH)
+    def _bary_scalar(x, fk, xk, vk):
+        """Compiled barycentric formula for a single evaluation point"""
+        numer = 0.
+        denom = 0.
+        for j in range(xk.size):
+            dx = x - xk[j]
+            if dx == 0.:
+                return fk[j]
+            tt = vk[j] / dx
+            numer += tt * fk[j]
+            denom += tt
+        return numer / denom
+
+    @numba.njit(cache=True, fastmath=FASTMATH)
+    def _bary_vec(xx, fk, xk, vk):
+        """Compiled barycentric formula for a 1-D array of evaluation
+        points, with the inner product weights vk*fk computed once"""
+        wk = vk * fk
+        out = np.empty(xx.size)
+        for i in range(xx.size):
+            numer = 0.
+            denom = 0.
+            for j in range(xk.size):
+                dx = xx[i] - xk[j]
+                if dx == 0.:
+                    numer, denom = fk[j], 1.
+                    break
+                tt = 1. / dx
+                numer += wk[j] * tt
+                denom += vk[j] * tt
+            out[i] = numer / denom
+        return out
+
+    @numba.njit(cache=True, fastmath=FASTMATH)
+    def _bary_vec_nohit(xx, fk, xk, vk):
+        """As _bary_vec, but without the check for exact hits on the nodes,
+        leaving a branch-free inner loop that can be vectorised"""
+        wk = vk * fk
+        out = np.empty(xx.size)
+        for i in range(xx.size):
+            numer = 0.
+            denom = 0.
+            for j in range(xk.size):
+                tt = 1. / (xx[i] - xk[j])
+                numer += wk[j] * tt
+                denom += vk[j] * tt
+            out[i] = numer / denom
+        return out
+
+    @numba.njit(cache=True, fastmath=FASTMATH, parallel=True)
+    def _clenshaw_kernel(xx, ak):
+        """Compiled Clenshaw recurrence. The recurrence is serial in the
+        coefficients, so the evaluation points are processed in parallel
+        blocks and the recurrence is advanced for a whole block at a time,
+        which lets the inner loop over the block vectorise."""
+        out = np.empty(xx.size)
+        nblocks = (xx.size + CLENSHAW_BLOCK - 1) // CLENSHAW_BLOCK
+        for b in numba.prange(nblocks):
+            lo = b * CLENSHAW_BLOCK
+            hi = min(lo + CLENSHAW_BLOCK, xx.size)
+            x2 = 2. * xx[lo:hi]
+            bk1 = np.zeros(hi-lo)
+            bk2 = np.zeros(hi-lo)
+            for k in range(ak.size-1, 0, -1):
+                for i in range(hi-lo):
+                    tmp = ak[k] + x2[i]*bk1[i] - bk2[i]
+                    bk2[i] = bk1[i]
+                    bk1[i] = tmp
+            for i in range(hi-lo):
+                out[lo+i] = ak[0] + .5*x2[i]*bk1[i] - bk2[i]
+        return out
+
+else:
+    _bary_scalar = _bary_vec = _bary_vec_nohit = _clenshaw_kernel = None
+
+
 @preandpostprocess
-def bary(xx, fk, xk, vk):
+def bary(xx, fk, xk, vk, assume_no_hit=False, dtype=None):
     """Barycentric interpolation formula. See:
 
     J.P. Berrut, L.N. Trefethen, Barycentric Lagrange Interpolation, SIAM
@@ -100,31 +207,125 @@ def bary(xx, fk, xk, vk):
         array of interpolation nodes
     vk: numpy ndarray
         barycentric weights corresponding to the interpolation nodes xk
+    assume_no_hit: bool
+        skip the handling of evaluation points which coincide with one of
+        the interpolation nodes; the output at any such point is nan
+    dtype: numpy dtype
+        floating point type in which to carry out the evaluation, e.g.
+        np.float32 to trade accuracy for half the memory traffic. The inputs
+        are cast once and the output is returned in double precision. The
+        compiled kernels are double precision only, so any other dtype uses
+        the numpy implementation.
     """
 
+    # cast the inputs to the requested working precision
+    if dtype is not None:
+        ctype = np.result_type(dtype, np.complex64)
+        xx, xk, vk = (np.asarray(a, dtype=dtype) for a in (xx, xk, vk))
+        fk = np.asarray(fk, dtype=ctype if np.iscomplexobj(fk) else dtype)
+    ftype = float if dtype is None else dtype
+
+    # use the compiled kernels if they are available
+    if _isjittable(xx, fk, xk, vk):
+        if assume_no_hit:
+            return _bary_vec_nohit(xx, fk, xk, vk)
+        elif xx.size == 1:
+            return np.array([_bary_scalar(xx[0], fk, xk, vk)])
+        return _bary_vec(xx, fk, xk, vk)
+
     # either iterate over the evaluation points, or ...
     if xx.size < 4*xk.size:
-        out = np.zeros(xx.size)
+        tt = _scratch('tt', xk.shape, np.result_type(xx, vk, ftype))
+        out = np.zeros(xx.size, dtype=np.result_type(tt, fk))
         for i in range(xx.size):
-            tt = vk / (xx[i] - xk)
+            np.subtract(xx[i], xk, out=tt)
+            np.divide(vk, tt, out=tt)
             out[i] = np.dot(tt, fk) / tt.sum()
 
-    # ... iterate over the barycenters
+    # ... iterate over the barycenters, accumulating the sums in place
     else:
-        numer = np.zeros(xx.size)
-        denom = np.zeros(xx.size)
+        denom = np.zeros(xx.shape, dtype=np.result_type(xx, vk, ftype))
+        numer = np.zeros(xx.shape, dtype=np.result_type(denom, fk))
+        temp = _scratch('temp', xx.shape, denom.dtype)
+        prod = _scratch('prod', xx.shape, numer.dtype)
         for j in range(xk.size):
-            temp = vk[j] / (xx - xk[j])
-            numer = numer + temp * fk[j]
-            denom = denom + temp
-        out = numer / denom
+            np.subtract(xx, xk[j], out=temp)
+            np.divide(vk[j], temp, out=temp)
+            np.multiply(temp, fk[j], out=prod)
+            numer += prod
+            denom += temp
+        out = numer
+        out /= denom
+
+    out = out if assume_no_hit else _replace_hits(out, xx, fk, xk)
+    return out.astype(np.result_type(out, float), copy=False)
+
 
-    # replace NaNs
+def bary_nohit(xx, fk, xk, vk):
+    """Barycentric interpolation formula for evaluation points known not to
+    coincide with any of the interpolation nodes xk, such as random samples.
+    Equivalent to bary(xx, fk, xk, vk, assume_no_hit=True)."""
+    return bary(xx, fk, xk, vk, assume_no_hit=True)
+
+
+def bary_batch(xxs, fk, xk, vk, nbytes=BARY_BATCH_BYTES):
+    """Barycentric interpolation formula applied to a sequence of arrays of
+    evaluation points sharing the same interpolant. The points are streamed
+    through in blocks of rows so that a single preallocated workspace of
+    at most nbytes (but at least one row) is reused across the whole
+    sequence.
+
+    Returns a list of arrays, one for each array in xxs.
+    """
+    xxs = [np.asarray(xx) for xx in xxs]
+    if len(xxs) == 0:
+        return []
+    if (fk.size <= 1) or np.any(np.isnan(fk)):
+        return [bary(xx, fk, xk, vk) for xx in xxs]
+
+    xx = np.concatenate([xx.ravel() for xx in xxs])
+    if _isjittable(xx, fk, xk, vk):
+        out = _bary_vec(xx, fk, xk, vk)
+    else:
+        out = np.empty(xx.size, dtype=np.result_type(fk, float))
+        itemsize = np.dtype(float).itemsize
+        blocksize = max(1, nbytes // (itemsize * xk.size))
+        buf = _scratch('batch', (min(blocksize, xx.size), xk.size), float)
+        for i in range(0, xx.size, blocksize):
+            x = xx[i:i+blocksize]
+            tt = buf[:x.size]
+            np.subtract(x[:,None], xk, out=tt)
+            np.divide(vk, tt, out=tt)
+            out[i:i+blocksize] = np.dot(tt, fk) / tt.sum(axis=1)
+        out = _replace_hits(out, xx, fk, xk)
+
+    splits = np.cumsum([xx.size for xx in xxs])[:-1]
+    return [y.reshape(x.shape) for x, y in zip(xxs, np.split(out, splits))]
+
+
+def _scratch(name, shape, dtype):
+    """Return an uninitialised work array of the given shape and dtype. The
+    underlying buffer is stored per thread under name and reused by later
+    calls whenever it is large enough, so that the numpy evaluation paths
+    do not allocate a fresh temporary for every arithmetic operation.
+    Arrays larger than _SCRATCH_MAX_BYTES are allocated afresh and not
+    kept, so that one large evaluation does not pin its memory."""
+    size = int(np.prod(shape))
+    buf = getattr(_BARY_SCRATCH, name, None)
+    if buf is None or buf.dtype != dtype or buf.size < size:
+        buf = np.empty(size, dtype=dtype)
+        if buf.nbytes <= _SCRATCH_MAX_BYTES:
+            setattr(_BARY_SCRATCH, name, buf)
+    return buf[:size].reshape(shape)
+
+
+def _replace_hits(out, xx, fk, xk):
+    """Replace the NaNs produced by the barycentric formula at evaluation
+    points coinciding with an interpolation node"""
     for k in find(np.isnan(out)):
         idx = find( xx[k] == xk )
         if idx.size > 0:
             out[k] = fk[idx[0]]
-
     return out
 
 
@@ -132,6 +333,17 @@ def bary(xx, fk, xk, vk):
 def clenshaw(xx, ak):
     """Clenshaw's algorithm for the evaluation of a first-kind Chebyshev 
     series expansion at some array of points x"""
+    if _isjittable(xx, ak):
+        return _clenshaw_kernel(xx, ak)
+    if ak.size <= CLENSHAW_UNROLL_MAX:
+        unrolled = _clenshaw_codegen(ak.size)
+        if xx.size == 1 and xx.dtype == np.float64:
+            # evaluating on Python scalars avoids the numpy overhead per
+            # operation and gives identical (IEEE double) results
+            return np.full(xx.shape, unrolled(xx.item(), ak.tolist()))
+        return unrolled(xx, ak)
+    if ak.size > CLENSHAW_PS_MIN:
+        return clenshaw_ps(xx, ak)
     bk1 = 0*xx
     bk2 = 0*xx
     xx = 2*xx
@@ -145,6 +357,96 @@ def clenshaw(xx, ak):
     return out
 
 
+def clenshaw_ps(xx, ak):
+    """Paterson-Stockmeyer (baby-step giant-step) evaluation of a first-kind
+    Chebyshev series. With k ~ sqrt(n), the identity
+    2*T_i*T_{jk} = T_{jk+i} + T_{jk-i} lets us rewrite the series as
+
+        p(x) = sum_j r_j(x) T_{jk}(x) = sum_j r_j(x) T_j(T_k(x)),
+
+    where each r_j has degree less than k. The baby steps T_0(x), ...,
+    T_{k-1}(x) are generated by the three-term recurrence, after which all of
+    the r_j(x) follow from a single matrix product; the giant step is then a
+    Clenshaw recurrence of length n/k in y = T_k(x). This replaces most of
+    the serial recurrence by BLAS work.
+
+    References
+    ----------
+    .. [1] M. S. Paterson and L. J. Stockmeyer, "On the number of nonscalar
+        multiplications necessary to evaluate polynomials", SIAM Journal on
+        Computing 2 (1973).
+    """
+    n = ak.size
+    x = np.ravel(xx)
+    if n < 2 or x.size == 0:
+        # constant (or empty) series and empty input need no recurrence
+        out = np.full(x.size, ak[0] if n else 0,
+                      dtype=np.result_type(x, ak, float))
+        return out.reshape(np.shape(xx))
+    k = int(np.ceil(np.sqrt(n)))
+    m = -(-n // k)
+
+    # coefficients of r_0, ..., r_{m-1} in rows, working down from the top
+    # block and folding the T_{jk-i} contributions into the block below
+    cfs = np.zeros(m*k, dtype=np.result_type(ak, float))
+    cfs[:n] = ak
+    rk = np.empty((m, k), dtype=cfs.dtype)
+    for j in range(m-1, 0, -1):
+        blk = cfs[j*k:(j+1)*k]
+        rk[j,0] = blk[0]
+        rk[j,1:] = 2 * blk[1:]
+        cfs[j*k-1:(j-1)*k:-1] -= blk[1:]
+    rk[0] = cfs[:k]
+
+    # evaluate in blocks of points to bound the size of the baby-step array
+    out = np.empty(x.size, dtype=np.result_type(x, rk))
+    tk = np.empty((k, min(x.size, max(CLENSHAW_BLOCK, 2**20//k))),
+                  dtype=np.result_type(x, float))
+    for lo in range(0, x.size, tk.shape[1]):
+        xb = x[lo:lo+tk.shape[1]]
+        tb = tk[:,:xb.size]
+        tb[0] = 1.
+        tb[1] = xb
+        for i in range(2, k):
+            tb[i] = 2*xb*tb[i-1] - tb[i-2]
+        yy = 2*xb*tb[k-1] - tb[k-2]
+        vk = np.dot(rk, tb)
+        bk1 = 0*yy
+        bk2 = 0*yy
+        yy2 = 2*yy
+        for j in range(m-1, 0, -1):
+            bk1, bk2 = vk[j] + yy2*bk1 - bk2, bk1
+        out[lo:lo+xb.size] = vk[0] + yy*bk1 - bk2
+    return out.reshape(np.shape(xx))
+
+
+def _clenshaw_codegen(n):
+    """Return Clenshaw's algorithm for series of length n with the loop over
+    the coefficients fully unrolled. The operations are exactly those of
+    the loop in clenshaw. The function is generated from source the first
+    time each n is requested and cached thereafter."""
+    try:
+        return _CLENSHAW_UNROLLED[n]
+    except KeyError:
+        pass
+    name = 'clenshaw_{}'.format(n)
+    lines = ['def {}(xx, ak):'.format(name),
+             '    {}, = ak'.format(', '.join('a{}'.format(k) for k in range(n))),
+             '    bk1 = 0*xx',
+             '    bk2 = 0*xx',
+             '    xx = 2*xx']
+    for k in range(n-1, 1, -2):
+        lines.append('    bk2 = a{} + xx*bk1 - bk2'.format(k))
+        lines.append('    bk1 = a{} + xx*bk2 - bk1'.format(k-1))
+    if np.mod(n-1, 2) == 1:
+        lines.append('    bk1, bk2 = a1 + xx*bk1 - bk2, bk1')
+    lines.append('    return a0 + .5*xx*bk1 - bk2')
+    namespace = {}
+    exec('\n'.join(lines), namespace)
+    _CLENSHAW_UNROLLED[n] = namespace[name]
+    return namespace[name]
+
+
 def standard_chop(coeffs, tol=None):
     """Chop a Chebyshev series to a given tolerance. This is a Python
     transcription of the algorithm described in:
@@ -217,7 +519,7 @@ def adaptive(cls, fun, hscale=1, maxpow2=None):
     for k in range(minpow2, max(minpow2, maxpow2)+1):
         n = 2**k + 1
         points = cls._chebpts(n)
-        values = fun(points)
+        values = fun(points.copy())
         coeffs = cls._vals2coeffs(values)
         eps = prefs.eps
         tol = eps*max(hscale, 1)  # scale (decrease) tolerance by hscale
@@ -234,12 +536,23 @@ def adaptive(cls, fun, hscale=1, maxpow2=None):
 
 def coeffmult(fc, gc):
     """Coefficient-Space multiplication of equal-length first-kind
-    Chebyshev series."""
-    Fc = np.append( 2.*fc[:1], (fc[1:], fc[:0:-1]) )
-    Gc = np.append( 2.*gc[:1], (gc[1:], gc[:0:-1]) )
-    ak = ifft( fft(Fc) * fft(Gc) )
-    ak = np.append( ak[:1], ak[1:] + ak[:0:-1] ) * .25
-    ak = ak[:fc.size]
+    Chebyshev series. Short series are multiplied directly via the
+    identity 2*T_i*T_j = T_{i+j} + T_{|i-j|}, longer series via the FFT of
+    their even extensions. The series are assumed to be padded with enough
+    trailing zeros for the product to fit."""
+    n = fc.size
+    if n <= COEFFMULT_DIRECT_MAX:
+        ak = np.convolve(fc, gc)[:n]
+        dk = np.convolve(fc, gc[::-1])
+        ak[0] += dk[n-1]
+        ak[1:] += dk[n:] + dk[n-2::-1]
+        ak = .5 * ak
+    else:
+        Fc = np.append( 2.*fc[:1], (fc[1:], fc[:0:-1]) )
+        Gc = np.append( 2.*gc[:1], (gc[1:], gc[:0:-1]) )
+        ak = ifft( fft(Fc) * fft(Gc) )
+        ak = np.append( ak[:1], ak[1:] + ak[:0:-1] ) * .25
+        ak = ak[:n]
     inputcfs = np.append(fc, gc)
     out = np.real(ak) if np.isreal(inputcfs).all() else ak
     return out
@@ -74,11 +74,11 @@ class Chebfun:
             out[idx] = fun(x[idx])
 
         # evaluate the breakpoint data for x at a breakpoint
-        breakpoints = self.breakpoints
-        for breakpoint in breakpoints:
-            out[x==breakpoint] = self.breakdata[breakpoint]
+        for breakpoint, value in self.breakdata.items():
+            out[x==breakpoint] = value
 
         # first and last funs used to evaluate outside of the chebfun domain
+        breakpoints = self.breakdata.keys()
         lpts, rpts = x < breakpoints[0], x > breakpoints[-1]
         out[lpts] = self.funs[0](x[lpts])
         out[rpts] = self.funs[-1](x[rpts])
@@ -213,7 +213,7 @@ class Chebfun:
     # ------------
     @property
     def breakpoints(self):
-        return np.array([x for x in self.breakdata.keys()])
+        return self.breakdata.keys().copy()
 
     @property
     @self_empty(np.array([]))
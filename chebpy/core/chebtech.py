@@ -3,6 +3,7 @@
 from __future__ import division
 
 import abc
+import functools
 import numpy as np
 
 from chebpy.core.smoothfun import Smoothfun
@@ -59,7 +60,7 @@ class Chebtech(Smoothfun):
         '''Initialise a Chebtech from the callable fun using n degrees of
         freedom.'''
         points = cls._chebpts(n)
-        values = fun(points)
+        values = fun(points.copy())
         coeffs = vals2coeffs2(values)
         return cls(coeffs, interval=interval)
 
@@ -113,6 +114,18 @@ class Chebtech(Smoothfun):
         '''Chebyshev expansion coefficients in the T_k basis'''
         return self._coeffs
 
+    @property
+    @self_empty(np.array([]))
+    def endvalues(self):
+        '''Values at the endpoints -1 and 1, read off directly from the
+        coefficients since T_k(-1) = (-1)^k and T_k(1) = 1. As in Clenshaw's
+        algorithm the sums run from the (small) trailing coefficients to the
+        leading ones.'''
+        ak = self.coeffs[::-1]
+        sk = ak.copy()
+        sk[-2::-2] *= -1
+        return np.array([sk.cumsum()[-1], ak.cumsum()[-1]])
+
     @property
     def interval(self):
         '''Interval that Chebtech is mapped to'''
@@ -390,18 +403,34 @@ if plt:
     setattr(Chebtech, 'plotcoeffs', plotcoeffs)
 
 
+# The points and weights depend only on n and are requested repeatedly (by
+# the adaptive constructor and by barycentric evaluation), so we memoise them.
+# The cached arrays are shared between callers and hence flagged read-only.
+@functools.lru_cache(maxsize=64)
+def _chebpts2_cached(n):
+    pts = chebpts2(n)
+    pts.flags.writeable = False
+    return pts
+
+@functools.lru_cache(maxsize=64)
+def _barywts2_cached(n):
+    wts = barywts2(n)
+    wts.flags.writeable = False
+    return wts
+
+
 class Chebtech2(Chebtech):
     '''Second-Kind Chebyshev technology'''
     
     @staticmethod
     def _chebpts(n):
         '''Return n Chebyshev points of the second-kind'''
-        return chebpts2(n)
+        return _chebpts2_cached(n)
 
     @staticmethod
     def _barywts(n):
         '''Barycentric weights for Chebyshev points of 2nd kind'''
-        return barywts2(n)
+        return _barywts2_cached(n)
     
     @staticmethod
     def _vals2coeffs(vals):
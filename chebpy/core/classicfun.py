@@ -93,7 +93,7 @@ class Classicfun(Fun):
     @property
     def endvalues(self):
         '''Return a 2-array of endpointvalues taken from the interval'''
-        return self.__call__(self.support)
+        return self.onefun.endvalues
 
     @property
     def interval(self):
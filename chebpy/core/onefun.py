@@ -101,6 +101,10 @@ class Onefun(object):
     def coeffs(self):
         raise NotImplementedError
 
+    @abc.abstractproperty
+    def endvalues(self):
+        raise NotImplementedError
+
     @abc.abstractproperty
     def isconst(self):
         raise NotImplementedError
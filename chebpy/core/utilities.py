@@ -2,15 +2,48 @@
 
 from __future__ import division
 
-import collections
 import numpy as np
 
 from chebpy.core.settings import userPrefs as prefs
 from chebpy.core.decorators import cast_other
+from chebpy.core.importing import import_optional
 from chebpy.core.exceptions import (IntervalGap, IntervalOverlap,
                                     IntervalValues, InvalidDomain,
                                     SupportMismatch, NotSubdomain)
 
+# numba, if the user has it installed, compiles the kernels here and in
+# algorithms.py; otherwise the pure numpy implementations are used
+numba = import_optional('numba', 'NUMBA')
+
+if numba:
+    @numba.njit(cache=True)
+    def _isinterior_kernel(x, a, b):
+        """Single pass evaluation of (a<x) & (x<b) into a boolean array"""
+        out = np.empty(x.size, dtype=np.bool_)
+        for i in range(x.size):
+            out[i] = (a < x[i]) & (x[i] < b)
+        return out
+
+    @numba.njit(cache=True)
+    def _count_interior_kernel(x, a, b):
+        """Single pass count of the entries of x satisfying a<x<b"""
+        count = 0
+        for i in range(x.size):
+            count += (a < x[i]) & (x[i] < b)
+        return count
+
+else:
+    _isinterior_kernel = _count_interior_kernel = None
+
+
+def _isjittable(*arrays):
+    """Check whether the compiled kernels can be applied to the inputs: the
+    kernels are only compiled for one-dimensional float64 arrays"""
+    return numba is not None and all(
+        type(a) is np.ndarray and a.ndim == 1 and a.dtype == np.float64
+        for a in arrays)
+
+
 def HTOL():
     return 5 * prefs.eps
 
@@ -38,13 +71,28 @@ class Interval(np.ndarray):
             raise IntervalValues
         return np.asarray((a,b), dtype=float).view(cls)
 
+    # The maps are evaluated in place on a single output array (plus one
+    # temporary in formap) so that for large arrays we avoid a fresh
+    # allocation per arithmetic operation. The operation order is that of
+    # the expressions in the comments, which map the endpoints exactly.
     def formap(self, y):
         a, b = self
-        return .5*b*(y+1.) + .5*a*(1.-y)
+        # .5*b*(y+1.) + .5*a*(1.-y)
+        out = y + 1.
+        out *= .5*b
+        tmp = 1. - y
+        tmp *= .5*a
+        out += tmp
+        return out
 
     def invmap(self, x):
         a, b = self
-        return (2.*x-a-b) / (b-a)
+        # (2.*x-a-b) / (b-a)
+        out = 2. * x
+        out -= a
+        out -= b
+        out /= b - a
+        return out
 
     def drvmap(self, y):
         a, b = self
@@ -66,8 +114,19 @@ class Interval(np.ndarray):
 
     def isinterior(self, x):
         a,b = self
+        if _isjittable(x):
+            return _isinterior_kernel(x, float(a), float(b))
         return np.logical_and(a<x, x<b)
 
+    def count_interior(self, x):
+        """Number of points of x in the interior of the interval, equivalent
+        to np.count_nonzero(self.isinterior(x)) but without forming the
+        intermediate boolean array when the compiled kernel is available"""
+        a,b = self
+        if _isjittable(x):
+            return int(_count_interior_kernel(x, float(a), float(b)))
+        return np.count_nonzero(self.isinterior(x))
+
     @property
     def hscale(self):
         a, b = self
@@ -222,13 +281,51 @@ def check_funs(funs):
     return sortedfuns
 
 
+class BreakData(object):
+    """Breakpoints and the function values assigned to them, stored as a pair
+    of arrays xs and ys. The read-only part of the mapping interface (keys,
+    values, items and lookup by breakpoint) is provided so that objects of
+    this class can be used as the breakpoint -> value dictionary they
+    replace, with keys() and values() returning the arrays themselves."""
+
+    __slots__ = ('xs', 'ys')
+
+    def __init__(self, xs=(), ys=()):
+        self.xs = np.asarray(xs, dtype=float)
+        self.ys = np.asarray(ys)
+
+    def __len__(self):
+        return self.xs.size
+
+    def __iter__(self):
+        return iter(self.xs)
+
+    def __contains__(self, x):
+        return bool(np.any(self.xs==x))
+
+    def __getitem__(self, x):
+        idx = np.flatnonzero(self.xs==x)
+        if idx.size == 0:
+            raise KeyError(x)
+        return self.ys[idx[0]]
+
+    def keys(self):
+        return self.xs
+
+    def values(self):
+        return self.ys
+
+    def items(self):
+        return list(zip(self.xs, self.ys))
+
+
 def compute_breakdata(funs):
     """Define function values at the interior breakpoints by averaging the
     left and right limits. This method is called after check_funs() and
     thus at the point of calling we are guaranteed to have a fully partitioned
     and nonoverlapping domain."""
     if funs.size == 0:
-        return collections.OrderedDict()
+        return BreakData()
     else:
         points = np.array([fun.support for fun in funs])
         values = np.array([fun.endvalues for fun in funs])
@@ -241,7 +338,7 @@ def compute_breakdata(funs):
         y = .5 * (yy[::2] + yy[1::2])
         xout = np.append(np.append(xl, x), xr)
         yout = np.append(np.append(yl, y), yr)
-        return collections.OrderedDict(zip(xout, yout))
+        return BreakData(xout, yout)
 
 
 def generate_funs(domain, bndfun_constructor, kwds={}):
@@ -4,12 +4,18 @@
 
 from __future__ import division
 
+import types
 import unittest
 import numpy as np
+from numpy.polynomial.chebyshev import chebmul, chebval
 
 from chebpy.core.settings import DefaultPrefs
 from chebpy.core.chebtech import Chebtech2
-from chebpy.core.algorithms import bary, clenshaw, coeffmult
+from chebpy.core.algorithms import (bary, bary_batch, bary_nohit, clenshaw,
+                                    clenshaw_ps, coeffmult,
+                                    COEFFMULT_DIRECT_MAX, CLENSHAW_UNROLL_MAX,
+                                    _clenshaw_codegen, _scratch,
+                                    _BARY_SCRATCH, _SCRATCH_MAX_BYTES)
 
 from tests.utilities import (testfunctions, scaled_tol, infNormLessThanTol,
                              infnorm)
@@ -31,14 +37,17 @@ np.seterr(divide='ignore', invalid='ignore')
 class Evaluation(unittest.TestCase):
     """Tests for the Barycentric formula and Clenshaw algorithm"""
 
-    def setUp(self):
+    # the inputs are never modified by the tests, so draw them once for the
+    # whole class rather than before each of the (many generated) tests
+    @classmethod
+    def setUpClass(cls):
         npts = 15
-        self.xk = Chebtech2._chebpts(npts)
-        self.vk = Chebtech2._barywts(npts)
-        self.fk = np.random.rand(npts)
-        self.ak = np.random.rand(11)
-        self.xx = -1 + 2*np.random.rand(9)
-        self.pts = -1 + 2*np.random.rand(1001)
+        cls.xk = Chebtech2._chebpts(npts)
+        cls.vk = Chebtech2._barywts(npts)
+        cls.fk = np.random.rand(npts)
+        cls.ak = np.random.rand(11)
+        cls.xx = -1 + 2*np.random.rand(9)
+        cls.pts = -1 + 2*np.random.rand(1001)
 
     # check an empty array is returned whenever either or both of the first
     # two arguments are themselves empty arrays
@@ -63,12 +72,101 @@ class Evaluation(unittest.TestCase):
     def test_clenshaw__scalar_input(self):
         for x in self.xx:
             self.assertTrue(np.isscalar(clenshaw(x,self.ak)))
-        self.assertFalse(np.isscalar(clenshaw(xx,self.ak)))
+        self.assertFalse(np.isscalar(clenshaw(self.xx,self.ak)))
 
     def test_bary__scalar_input(self):
         for x in self.xx:
             self.assertTrue(np.isscalar(bary(x,self.fk,self.xk,self.vk)))
-        self.assertFalse(np.isscalar(bary(xx,self.fk,self.xk,self.vk)))
+        self.assertFalse(np.isscalar(bary(self.xx,self.fk,self.xk,self.vk)))
+
+    # check that evaluating at the interpolation nodes recovers the
+    # function values exactly, for both scalar and array input
+    def test_bary__exact_hit(self):
+        for xj, fj in zip(self.xk, self.fk):
+            self.assertEqual(bary(xj, self.fk, self.xk, self.vk), fj)
+        fx = bary(self.xk, self.fk, self.xk, self.vk)
+        self.assertTrue(np.all(fx==self.fk))
+
+    # the random points self.pts are (almost surely) not interpolation nodes,
+    # so we can skip the handling of exact hits
+    def test_bary_nohit(self):
+        fx = bary(self.pts, self.fk, self.xk, self.vk)
+        fy = bary(self.pts, self.fk, self.xk, self.vk, assume_no_hit=True)
+        fz = bary_nohit(self.pts, self.fk, self.xk, self.vk)
+        self.assertLessEqual(infnorm(fx-fy), 1e1*eps)
+        self.assertLessEqual(infnorm(fx-fz), 1e1*eps)
+        self.assertTrue(np.isscalar(bary_nohit(.1, self.fk, self.xk, self.vk)))
+
+    # check that batched evaluation agrees with evaluating each array of
+    # points separately, including at the interpolation nodes themselves
+    def test_bary_batch(self):
+        xxs = (self.xx, self.pts, self.xk, np.array([]))
+        nbytes = 100 * self.xk.nbytes
+        out = bary_batch(xxs, self.fk, self.xk, self.vk, nbytes=nbytes)
+        self.assertEqual(len(out), len(xxs))
+        for xx, fx in zip(xxs[:-1], out[:-1]):
+            fb = bary(xx, self.fk, self.xk, self.vk)
+            self.assertLessEqual(infnorm(fx-fb), 1e1*eps)
+        self.assertEqual(out[-1].size, 0)
+        self.assertEqual(bary_batch([], self.fk, self.xk, self.vk), [])
+        # a budget smaller than a single row still evaluates row by row
+        fx, = bary_batch([self.xx], self.fk, self.xk, self.vk, nbytes=0)
+        fb = bary(self.xx, self.fk, self.xk, self.vk)
+        self.assertLessEqual(infnorm(fx-fb), 1e1*eps)
+
+    # check that small work arrays are reused but oversized ones are not kept
+    def test_scratch(self):
+        self.addCleanup(delattr, _BARY_SCRATCH, 'test')
+        a = _scratch('test', (10,), float)
+        self.assertIs(_scratch('test', (5,), float).base, a.base)
+        n = _SCRATCH_MAX_BYTES // a.itemsize + 1
+        b = _scratch('test', (n,), float)
+        self.assertEqual(b.shape, (n,))
+        self.assertIs(_scratch('test', (10,), float).base, a.base)
+
+    # check the shape and dtype of single point input are preserved
+    def test_clenshaw__single_point_shape(self):
+        for xx in (np.array([.2]), np.array([[.2]])):
+            self.assertEqual(clenshaw(xx, self.ak).shape, xx.shape)
+        for dtype in (np.float32, np.float64):
+            fx = clenshaw(np.array([.3], dtype=dtype), self.ak)
+            fy = clenshaw(np.array([.3, .4], dtype=dtype), self.ak)
+            self.assertEqual(fx.dtype, fy.dtype)
+
+    # check the unrolled recurrences for short series against clenshaw
+    def test_clenshaw_unrolled(self):
+        for n in range(2, CLENSHAW_UNROLL_MAX+1):
+            ak = self.pts[:n]
+            unrolled = _clenshaw_codegen(n)
+            fx = unrolled(self.pts, ak)
+            tol = 1e1 * n * eps * np.abs(ak).sum()
+            self.assertLessEqual(infnorm(fx-clenshaw(self.pts, ak)), tol)
+            self.assertEqual(unrolled(self.xx[0], ak.tolist()),
+                             unrolled(self.xx[:1], ak)[0])
+
+    # check the Paterson-Stockmeyer splitting against numpy's chebval,
+    # including constant series, empty input, series lengths which are not a
+    # multiple of the block size and enough points to be split into several
+    # blocks
+    def test_clenshaw_ps(self):
+        xx = np.linspace(-1, 1, 20001)
+        for n in (1, 2, 3, 10, 65, 99, 100, 301):
+            ak = exp(-.1*np.arange(n)) * self.pts[:n]
+            fx = clenshaw_ps(xx, ak)
+            fy = chebval(xx, ak)
+            tol = 1e1 * n * eps * np.abs(ak).sum()
+            self.assertEqual(fx.shape, xx.shape)
+            self.assertLessEqual(infnorm(fx-fy), tol)
+            self.assertEqual(clenshaw_ps(np.array([]), ak).size, 0)
+
+    # single precision evaluation returns double precision output
+    def test_bary_float32_output(self):
+        fx = bary(self.pts, self.fk, self.xk, self.vk, dtype=np.float32)
+        fy = bary(self.pts, self.fk, self.xk, self.vk)
+        self.assertEqual(fx.dtype, np.float64)
+        self.assertLessEqual(infnorm(fx-fy), 1e2*np.finfo(np.float32).eps)
+        fz = bary(self.xx[0], self.fk, self.xk, self.vk, dtype=np.float32)
+        self.assertIsInstance(fz, np.float64)
 
     # Check that we always get float output for constant Chebtechs, even 
     # when passing in an integer input.
@@ -99,45 +197,72 @@ class Evaluation(unittest.TestCase):
 
 evalpts = [np.linspace(-1,1,int(n)) for n in np.array([1e2, 1e3, 1e4, 1e5])]
 ptsarry = [Chebtech2._chebpts(n) for n in np.array([100, 200])]
-methods = [bary, clenshaw]
+methods = [bary, bary_batch, clenshaw]
+
+tol_multipliers = {bary: 1e0, bary_batch: 1e0, clenshaw: 2e1}
 
-def evalTester(method, fun, evalpts, chebpts):
+# working precisions to test each method in; the tolerances are scaled by the
+# machine epsilon of the working precision
+dtypes = {bary: [np.float64, np.float32], bary_batch: [np.float64],
+          clenshaw: [np.float64]}
 
-    x = evalpts
+def _prep(fun, chebpts):
+    """Values, barycentric weights and coefficients of fun at chebpts: these
+    are shared by every method and every array of evaluation points"""
     xk = chebpts
     fvals = fun(xk)
-
-    if method is bary:
-        vk = Chebtech2._barywts(fvals.size)
-        a = bary(x, fvals, xk, vk)
-        tol_multiplier = 1e0
-
+    vk = Chebtech2._barywts(fvals.size)
+    ak = Chebtech2._vals2coeffs(fvals)
+    for arr in (fvals, ak):
+        arr.flags.writeable = False
+    return xk, fvals, vk, ak
+
+# lookup table of the above, computed once at import and shared (read-only)
+# by all of the generated tests
+PRECOMP = types.MappingProxyType({
+    (fun.__name__, j): _prep(fun, chebpts)
+    for (fun, _, _) in testfunctions
+    for j, chebpts in enumerate(ptsarry)})
+
+def _eval(method, evalpts, prep, dtype):
+    xk, fvals, vk, ak = prep
+    if method is bary_batch:
+        return bary_batch(evalpts, fvals, xk, vk)
+    elif method is bary and dtype is np.float64:
+        return [bary(x, fvals, xk, vk) for x in evalpts]
+    elif method is bary:
+        return [bary(x, fvals, xk, vk, dtype=dtype) for x in evalpts]
     elif method is clenshaw:
-        ak = Chebtech2._vals2coeffs(fvals)
-        a = clenshaw(x, ak)
-        tol_multiplier = 2e1
-
-    b = fun(evalpts)
-    n = evalpts.size
-    tol = tol_multiplier * scaled_tol(n)
-
-    return infNormLessThanTol(a, b, tol)
+        return [clenshaw(x, ak) for x in evalpts]
+
+def evalTester(method, fun, evalpts, prep, dtype=np.float64):
+    testfuns = []
+    for x, a in zip(evalpts, _eval(method, evalpts, prep, dtype)):
+        b = fun(x)
+        n = x.size
+        tol = tol_multipliers[method] * scaled_tol(n)
+        tol = tol * np.finfo(dtype).eps / eps
+        testfuns.append(infNormLessThanTol(a, b, tol))
+    return testfuns
 
 for method in methods:
-    for (fun, _, _) in testfunctions:
-        for j, chebpts in enumerate(ptsarry):
-            for k, xx in enumerate(evalpts):
-                testfun = evalTester(method, fun, xx, chebpts)
-                testfun.__name__ = "test_{}_{}_{:02}_{:02}".format(
-                    method.__name__, fun.__name__, j, k)
-                setattr(Evaluation, testfun.__name__, testfun)
+    for dtype in dtypes[method]:
+        suffix = "" if dtype is np.float64 else "_" + np.dtype(dtype).name
+        for (fun, _, _) in testfunctions:
+            for j in range(len(ptsarry)):
+                prep = PRECOMP[(fun.__name__, j)]
+                testfuns = evalTester(method, fun, evalpts, prep, dtype)
+                for k, testfun in enumerate(testfuns):
+                    testfun.__name__ = "test_{}{}_{}_{:02}_{:02}".format(
+                        method.__name__, suffix, fun.__name__, j, k)
+                    setattr(Evaluation, testfun.__name__, testfun)
 
 
 class CoeffMult(unittest.TestCase):
 
     def setUp(self):
-        self.f = lambda x: exp(x)
-        self.g = lambda x: cos(x)
+        self.f = exp
+        self.g = cos
         self.fn = 15
         self.gn = 15
 
@@ -152,6 +277,19 @@ class CoeffMult(unittest.TestCase):
         HC = Chebtech2.initfun(h, hn).coeffs
         self.assertLessEqual( infnorm(hc-HC), 2e1*eps)
 
+    # check both the direct and FFT-based products against numpy either
+    # side of the crossover length
+    def test_coeffmult_direct_fft(self):
+        for n in (COEFFMULT_DIRECT_MAX, COEFFMULT_DIRECT_MAX+1):
+            m = n // 2
+            fc = np.append(np.random.rand(m), np.zeros(n-m))
+            gc = np.append(np.random.rand(m), np.zeros(n-m))
+            hc = coeffmult(fc, gc)
+            HC = chebmul(fc, gc)[:n]
+            HC = np.append(HC, np.zeros(n-HC.size))
+            self.assertEqual(hc.size, n)
+            self.assertLessEqual(infnorm(hc-HC), 1e1*eps*infnorm(HC))
+
 
 # reset the testsfun variable so it doesn't get picked up by nose
 testfun = None
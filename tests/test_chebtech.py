@@ -52,6 +52,25 @@ class ChebyshevPoints(unittest.TestCase):
             ak = np.array([k])
             self.assertLessEqual(infnorm(_coeffs2vals(ak)-ak), eps)
 
+    # check the memoised points and weights are shared and read-only
+    def test_chebpts_barywts_cached(self):
+        for f in (Chebtech2._chebpts, Chebtech2._barywts):
+            a, b = f(17), f(17)
+            self.assertIs(a, b)
+            self.assertFalse(a.flags.writeable)
+
+    # the cached points are read-only, but callables passed to the
+    # constructors may still modify their argument in place
+    def test_initfun_inplace_callable(self):
+        def f(x):
+            x **= 2
+            return x
+        ff = Chebtech2.initfun_fixedlen(f, 10)
+        gg = Chebtech2.initfun_adaptive(f)
+        self.assertLessEqual(abs(ff(.5)-.25), 1e1*eps)
+        self.assertLessEqual(abs(gg(.5)-.25), 1e1*eps)
+        self.assertTrue(np.all(Chebtech2._chebpts(10)[[0,-1]]==[-1,1]))
+
     # TODO: further checks for chepbts
 
 # ------------------------------------------------------------------------
@@ -180,6 +199,14 @@ class ClassUsage(unittest.TestCase):
         for k in [0, 1, 20, self.ff.size, 200]:
             self.assertEquals(self.ff.prolong(k).size, k)
             
+    def test_endvalues(self):
+        for n in (1, 2, 3, self.ff.size):
+            gg = self.ff.prolong(n)
+            fa, fb = gg.endvalues
+            self.assertLessEqual(abs(fa-gg(-1.)), 1e1*eps)
+            self.assertLessEqual(abs(fb-gg(1.)), 1e1*eps)
+        self.assertEquals(Chebtech2(np.array([])).endvalues.size, 0)
+
     def test_vscale_empty(self):
         gg = Chebtech2(np.array([]))
         self.assertEquals(gg.vscale, 0.)
@@ -99,10 +99,15 @@ class TestInterval(unittest.TestCase):
         x3 = np.linspace(3,4,npts)
         x4 = np.linspace(5,6,npts)
         interval = Interval(-2,3)
-        self.assertEquals(interval.isinterior(x1).sum(), npts-2)
-        self.assertEquals(interval.isinterior(x2).sum(), 0)
-        self.assertEquals(interval.isinterior(x3).sum(), 0)
-        self.assertEquals(interval.isinterior(x4).sum(), 0)
+        self.assertEquals(np.count_nonzero(interval.isinterior(x1)), npts-2)
+        self.assertEquals(np.count_nonzero(interval.isinterior(x2)), 0)
+        self.assertEquals(np.count_nonzero(interval.isinterior(x3)), 0)
+        self.assertEquals(np.count_nonzero(interval.isinterior(x4)), 0)
+        self.assertEquals(interval.count_interior(x1), npts-2)
+        self.assertEquals(interval.count_interior(x2), 0)
+        self.assertEquals(interval.count_interior(x3), 0)
+        self.assertEquals(interval.count_interior(x4), 0)
+        self.assertEquals(interval.count_interior(np.array([0, 1, 5])), 2)
 
 
 # tests for usage of the Domain class
@@ -355,8 +360,8 @@ class ComputeBreakdata(unittest.TestCase):
 
     def test_compute_breakdata_empty(self):
         breaks = compute_breakdata(np.array([]))
-        # list(...) for Python 2/3 compatibility
-        self.assertTrue(np.array(list(breaks.items())).size==0)
+        self.assertTrue(len(breaks)==0)
+        self.assertFalse(breaks)
 
     def test_compute_breakdata_1(self):
         funs = np.array([self.fun0])
@@ -374,5 +379,20 @@ class ComputeBreakdata(unittest.TestCase):
         self.assertLessEqual(infnorm(y-np.array([np.exp(-1),np.exp(0),
                                                  np.exp(1)])), 2*eps)
 
+    def test_compute_breakdata_arrays(self):
+        funs = np.array([self.fun0, self.fun1])
+        breaks = compute_breakdata(funs)
+        self.assertIsInstance(breaks.keys(), np.ndarray)
+        self.assertIsInstance(breaks.values(), np.ndarray)
+        self.assertEqual(len(breaks), 3)
+        items = breaks.items()
+        self.assertEqual(len(items), 3)
+        for x, y in items:
+            self.assertTrue(x in breaks)
+            self.assertEqual(breaks[x], y)
+        self.assertEqual(list(items), list(breaks.items()))
+        self.assertFalse(.5 in breaks)
+        self.assertRaises(KeyError, breaks.__getitem__, .5)
+
 # reset the testsfun variable so it doesn't get picked up by nose
 testfun = None